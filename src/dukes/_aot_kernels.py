@@ -0,0 +1,60 @@
+# Created by Yen-Hsun Lin (Academia Sinica) in 03/2024.
+# Copyright (c) 2024 Yen-Hsun Lin.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version (see <http://www.gnu.org/licenses/>).
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+
+
+"""
+
+This module describes the optional ahead-of-time compiled extension
+_kernels_aot built with numba.pycc. It exports the single-threaded batch
+kernel so that vegas worker processes (nproc > 1) do not compile it on
+first use. numba.pycc cannot compile parallel kernels, the default
+nproc = 1 path keeps the cached _kernels._dbdmSpectrumBatch. The
+extension is not built on installation, build it in place with
+
+    python -m dukes._aot_kernels
+
+from the src directory. The extension carries the hash of the kernel
+sources and constants it was built from, dukesMain ignores it once they
+change until it is rebuilt.
+
+"""
+
+from os.path import dirname
+from numba.pycc import CC
+from ._kernels import _dbdmSpectrumBatchSerial,_sourceHash
+
+
+cc = CC('_kernels_aot')
+cc.output_dir = dirname(__file__)
+_SOURCE_HASH = _sourceHash()  # frozen into the extension at build time
+
+
+@cc.export('sourceHash','i8()')
+def sourceHash():
+    return _SOURCE_HASH
+
+
+# (z,MG,Tx,R,l,theta,thetaCM,tBH,areaDensity,mx,is_spike,is_ann,is_weighted,is_event,
+#  sigv,rhosMW,rsMW,eta,table,u0,du,lnMG0,dlnMG), the spike table is passed unpacked
+@cc.export('dbdmSpectrumBatchSerial',
+           'f8[:](f8[:],f8[:],f8[:],f8[:],f8[:],f8[:],f8[:],f8[:],f8[:],f8,b1,b1,b1,b1,'
+           'f8,f8,f8,f8,f8[:,:],f8,f8,f8,f8)')
+def dbdmSpectrumBatchSerial(z,MG,Tx,R,l,theta,thetaCM,tBH,areaDensity,mx,is_spike,is_ann,is_weighted,is_event,
+                            sigv,rhosMW,rsMW,eta,table,u0,du,lnMG0,dlnMG):
+    return _dbdmSpectrumBatchSerial(z,MG,Tx,R,l,theta,thetaCM,tBH,areaDensity,mx,is_spike,is_ann,is_weighted,is_event,
+                                    sigv,rhosMW,rsMW,eta,(table,u0,du,lnMG0,dlnMG))
+
+
+if __name__ == '__main__':
+    cc.compile()
@@ -0,0 +1,593 @@
+# Created by Yen-Hsun Lin (Academia Sinica) in 03/2024.
+# Copyright (c) 2024 Yen-Hsun Lin.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version (see <http://www.gnu.org/licenses/>).
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+
+
+"""
+
+This module contains the Numba-compiled scalar kernels evaluated on the
+vegas hot path. The physics functions in dukesMain and galMassFunction are
+thin wrappers over them. The kernels take floats only: MG is always a
+number and sigv <= 0 indicates no annihilation.
+The constants are read from the constant class at import time and are
+frozen into the compiled code.
+
+"""
+
+import math
+import hashlib as _hashlib
+from os.path import dirname as _dirname,join as _join
+import numpy as _np
+from numba import njit,prange
+from .constant import constant
+
+
+# ----- Constants frozen into the kernels -----
+_Msun         = constant.Msun
+_Msun_kg      = constant.Msun_kg
+_Mmw          = constant.Mmw
+_kpc2cm       = constant.kpc2cm
+_year2Seconds = constant.year2Seconds
+_Lv           = constant.Lv*constant.erg2MeV  # MeV/s
+_G            = constant.G
+_Omega_0m     = constant.Omega_0m
+_Omega_0L     = constant.Omega_0L
+_LN10         = math.log(10)  # 10**x is evaluated as exp(x*_LN10)
+
+# SN neutrino temperatures (MeV) for nu_e, anti-nu_e and the rest 4 species, and
+# the Fermi-Dirac normalizations including the species weights 1/11, 1/16 and 4/25
+_Tv           = _np.array([2.76,4.01,6.26])
+_fvNorm       = 1/(18.9686*_Tv**3*_np.array([11,16,25/4]))
+
+
+def _sourceHash() -> int:
+    """
+    Hash of the sources of this module and _aot_kernels together with the
+    constants, compiled into the ahead-of-time extension _kernels_aot so that
+    an extension built from other kernels or constants can be told apart
+    """
+    digest = _hashlib.sha256()
+    for name in ('_kernels.py','_aot_kernels.py'):
+        with open(_join(_dirname(__file__),name),'rb') as f:
+            digest.update(f.read())
+    digest.update(repr(sorted((k,v) for k,v in vars(constant).items() if not k.startswith('_'))).encode())
+    return int(digest.hexdigest()[:15],16)  # fits in int64
+
+
+
+##########################################################################
+#                                                                        #
+#   Dark matter halo profile                                             #
+#                                                                        #
+##########################################################################
+
+
+@njit(cache=True,fastmath=True)
+def rhox(r,rhos,rs):
+    """
+    NFW DM density at given r, MeV/cm^3
+    """
+    rr = r/rs
+    return rhos/(rr*(1 + rr)**2)
+
+
+@njit(cache=True,fastmath=True)
+def get_rs(MG,rsMW):
+    """
+    Characteristic radius scaled from MW, kpc
+    """
+    return _np.cbrt(MG/_Mmw)*rsMW
+
+
+@njit(cache=True,fastmath=True)
+def massBH(MG,eta):
+    """
+    SMBH mass estimated from MG, Msun
+    """
+    return 7e7*_np.cbrt(eta*MG/1e12)**4
+
+
+@njit(cache=True,fastmath=True)
+def radiusSchwarzschild(mBH):
+    """
+    Schwarzschild radius, kpc
+    """
+    return mBH*_Msun_kg*1.48e-25/_kpc2cm
+
+
+@njit(cache=True,fastmath=True)
+def _rh(mBH):
+    """
+    SMBH influence radius from the Faber–Jackson law, kpc
+    """
+    sigma = 200*(mBH/1e8/1.9)**(1/5.1)
+    return _G*mBH/sigma**2*1e-3
+
+
+@njit(cache=True,fastmath=True)
+def _fa32(r,Rs):
+    """
+    Integrand of the normalization N with alpha = 3/2 plugged in, i.e.
+    (r^3/(3 - alpha) + 12Rs r^2/(alpha - 2) - 48Rs^2 r/(alpha - 1) + 64Rs^3/alpha)/r^alpha
+    """
+    return (2/3*r**3 - 24*Rs*r**2 - 96*Rs**2*r + 128/3*Rs**3)/(r*math.sqrt(r))
+
+
+@njit(cache=True,fastmath=True)
+def _normN(mBH,rh):
+    """
+    The spike normalization N
+    """
+    Rs = radiusSchwarzschild(mBH)
+    ri = 4*Rs
+    fh,fi = _fa32(rh,Rs),_fa32(ri,Rs)
+    return mBH*_Msun/4/math.pi/(fh - fi)
+
+
+@njit(cache=True,fastmath=True)
+def _radiusSpike(N,rh,rhos,rs):
+    """
+    Spike radius from the normalization N, kpc
+    """
+    rhos = rhos*_kpc2cm**3
+    return (N/rhos/rs)**(3/4)*rh**(5/8)
+
+
+@njit(cache=True,fastmath=True)
+def _rhoPrime(r,ri,rh,Rsp,rhoN,rhoNp):
+    """
+    Spike density with the halo quantities precomputed, MeV/cm^3
+    """
+    if ri <= r < rh:
+        rhoP = rhoN*(1 - ri/r)**3*(rh/r)**(3/2)
+    else:
+        rhoP = rhoNp*(Rsp/r)**(7/3)
+    return rhoP/_kpc2cm**3
+
+
+@njit(cache=True,fastmath=True)
+def _rhoSpike(r,MG,rhosMW,rsMW,eta):
+    """
+    DM density with spike in the center before annihilation, MeV/cm^3
+    """
+    return _rhoSpikeHalo(r,massBH(MG,eta),get_rs(MG,rsMW),rhosMW)
+
+
+@njit(cache=True,fastmath=True)
+def _rhoSpikeHalo(r,mBH,rs,rhosMW):
+    """
+    _rhoSpike for the given SMBH mass mBH, Msun, and characteristic radius rs, kpc
+    """
+    # halo quantities depending on MG only, evaluated once per sample
+    rh = _rh(mBH)
+    ri = 4*radiusSchwarzschild(mBH)
+    if r < ri:
+        return 0.0
+    N = _normN(mBH,rh)
+    Rsp = _radiusSpike(N,rh,rhosMW,rs)
+
+    if r < Rsp:
+        rhoN = N/rh**(3/2)
+        rhoNp = rhoN*(rh/Rsp)**(7/3)
+        return _rhoPrime(r,ri,rh,Rsp,rhoN,rhoNp)
+    else:
+        return rhox(r,rhosMW,rs)
+
+
+@njit(cache=True,fastmath=True)
+def _nxSpike(r,mx,mBH,rs,sigv,tBH,rhosMW):
+    """
+    DM number density with spike evaluated analytically for the given SMBH
+    mass mBH and characteristic radius rs, #/cm^3
+    sigv <= 0 means no annihilation
+    """
+    rho = _rhoSpikeHalo(r,mBH,rs,rhosMW)
+    if sigv > 0:
+        rhoc = mx/(sigv*1e-26)/tBH/_year2Seconds
+        return rho*rhoc/(rho + rhoc)/mx
+    else:
+        return rho/mx
+
+
+@njit(cache=True,fastmath=True,inline='always')
+def _rhoSpikeAt(r,MG,rhosMW,rsMW,eta,spikeTable):
+    """
+    _rhoSpike interpolated from spikeTable = (table,u0,du,lnMG0,dlnMG), see
+    _rhoSpikeTable, or evaluated analytically if the table is empty
+    """
+    table,u0,du,lnMG0,dlnMG = spikeTable
+    if table.size == 0:
+        return _rhoSpike(r,MG,rhosMW,rsMW,eta)
+    ri = 4*radiusSchwarzschild(massBH(MG,eta))
+    if r <= ri:
+        return 0.0
+    return math.exp(_bilinear(table,u0,du,lnMG0,dlnMG,math.log(r/ri - 1),math.log(MG)))
+
+
+# ----- DM number density specialized on (is_spike, is_ann) -----
+# dmNumberDensity and the spectra calling it are inlined into the batch kernels,
+# which run one loop per variant with constant flags, so each loop is compiled
+# with its density branch folded away
+
+@njit(cache=True,fastmath=True)
+def _nxSpikeAnn(r,mx,MG,sigv,tBH,rhosMW,rsMW,eta,spikeTable):
+    """
+    DM number density with spike saturated by annihilation with sigv > 0, #/cm^3
+    """
+    rho = _rhoSpikeAt(r,MG,rhosMW,rsMW,eta,spikeTable)
+    rhoc = mx/(sigv*1e-26)/tBH/_year2Seconds
+    return rho*rhoc/(rho + rhoc)/mx
+
+
+@njit(cache=True,fastmath=True)
+def _nxSpikeNoAnn(r,mx,MG,rhosMW,rsMW,eta,spikeTable):
+    """
+    DM number density with spike and no annihilation, #/cm^3
+    """
+    return _rhoSpikeAt(r,MG,rhosMW,rsMW,eta,spikeTable)/mx
+
+
+@njit(cache=True,fastmath=True)
+def _nxNFW(r,mx,MG,rhosMW,rsMW):
+    """
+    DM number density of the NFW halo, #/cm^3
+    """
+    return rhox(r,rhosMW,get_rs(MG,rsMW))/mx
+
+
+@njit(cache=True,fastmath=True,inline='always')
+def dmNumberDensity(r,mx,MG,is_spike,is_ann,sigv,tBH,rhosMW,rsMW,eta,spikeTable):
+    """
+    DM number density at r with arbitrary MG, #/cm^3
+
+    is_ann: annihilation with sigv > 0, it only saturates the spike
+    spikeTable: tabulated spike density, see _rhoSpikeAt
+    """
+    if is_spike:
+        if is_ann:
+            return _nxSpikeAnn(r,mx,MG,sigv,tBH,rhosMW,rsMW,eta,spikeTable)
+        else:
+            return _nxSpikeNoAnn(r,mx,MG,rhosMW,rsMW,eta,spikeTable)
+    else:
+        return _nxNFW(r,mx,MG,rhosMW,rsMW)
+
+
+# ----- Tabulated spike density -----
+# The spike density is tabulated in u = log(r/ri - 1) rather than log(r), so the
+# inner cutoff ri is never inside a grid cell and the (1 - ri/r)^3 fall-off near
+# ri becomes linear in u. An empty table means evaluating the spike analytically.
+
+_noSpikeTable = (_np.empty((0,0)),0.0,1.0,0.0,1.0)
+
+
+@njit(cache=True,fastmath=True)
+def _bilinear(table,x0,dx,y0,dy,x,y):
+    """
+    Bilinear interpolation of table on the uniform grid x0 + i*dx, y0 + j*dy,
+    constant beyond the edges
+    """
+    fx = (x - x0)/dx
+    fy = (y - y0)/dy
+    i = min(max(int(math.floor(fx)),0),table.shape[0] - 2)
+    j = min(max(int(math.floor(fy)),0),table.shape[1] - 2)
+    tx = min(max(fx - i,0.0),1.0)
+    ty = min(max(fy - j,0.0),1.0)
+    return ((1 - tx)*(1 - ty)*table[i,j] + tx*(1 - ty)*table[i + 1,j]
+            + (1 - tx)*ty*table[i,j + 1] + tx*ty*table[i + 1,j + 1])
+
+
+@njit(cache=True,fastmath=True,parallel=True)
+def _rhoSpikeTable(u,lnMG,rhosMW,rsMW,eta):
+    """
+    log of _rhoSpike on the grid (u,lnMG) where u = log(r/ri - 1) and lnMG = log(MG)
+    """
+    table = _np.empty((u.size,lnMG.size))
+    for j in prange(lnMG.size):
+        MG = math.exp(lnMG[j])
+        ri = 4*radiusSchwarzschild(massBH(MG,eta))
+        for i in range(u.size):
+            table[i,j] = math.log(_rhoSpike(ri*(1 + math.exp(u[i])),MG,rhosMW,rsMW,eta))
+    return table
+
+
+@njit(cache=True,fastmath=True)
+def _rhoSpikeTableSerial(u,lnMG,rhosMW,rsMW,eta):
+    """
+    Single-threaded _rhoSpikeTable for building the table in a process that
+    vegas forks afterwards
+    """
+    table = _np.empty((u.size,lnMG.size))
+    for j in range(lnMG.size):
+        MG = math.exp(lnMG[j])
+        ri = 4*radiusSchwarzschild(massBH(MG,eta))
+        for i in range(u.size):
+            table[i,j] = math.log(_rhoSpike(ri*(1 + math.exp(u[i])),MG,rhosMW,rsMW,eta))
+    return table
+
+
+# ----- Galactic area density on its data grid -----
+
+@njit(cache=True,fastmath=True)
+def _interpGrid(x,y,xs,ys,table):
+    """
+    Bilinear interpolation of table on the rectilinear grid (xs,ys), the same
+    as scipy's RegularGridInterpolator with method = 'linear'
+    """
+    if not (xs[0] <= x <= xs[-1] and ys[0] <= y <= ys[-1]):
+        raise ValueError('One of the requested xi is out of bounds.')
+    i = min(max(_np.searchsorted(xs,x) - 1,0),xs.size - 2)
+    j = min(max(_np.searchsorted(ys,y) - 1,0),ys.size - 2)
+    tx = (x - xs[i])/(xs[i + 1] - xs[i])
+    ty = (y - ys[j])/(ys[j + 1] - ys[j])
+    return ((1 - tx)*(1 - ty)*table[i,j] + tx*(1 - ty)*table[i + 1,j]
+            + (1 - tx)*ty*table[i,j + 1] + tx*ty*table[i + 1,j + 1])
+
+
+@njit(cache=True,fastmath=True)
+def _areaDensityBatch(R,m,R_data,MG_data,rho_data):
+    """
+    galDensity.galacticAreaDensityFit for (n,) arrays of R, kpc, and m = log10(MG),
+    the data grid is passed in as galDensity._areaDensityGrid
+    """
+    out = _np.empty(R.size)
+    for k in range(R.size):
+        out[k] = _interpGrid(R[k],m[k],R_data,MG_data,rho_data)
+    return out
+
+
+
+##########################################################################
+#                                                                        #
+#   Supernova neutrinos and propagation geometry                         #
+#                                                                        #
+##########################################################################
+
+
+@njit(cache=True,fastmath=True)
+def _get_r(l,R,theta):
+    """
+    Distance between boosted point and GC, kpc
+    """
+    # law of cosines as a hypotenuse, free of the cancellation at r << l
+    return math.hypot(l - R*math.cos(theta),R*math.sin(theta))
+
+
+@njit(cache=True,fastmath=True)
+def snNuEenergy(Tx,mx,thetaCM):
+    """
+    Required incoming SN neutrino energy Ev, MeV
+    """
+    c2 = math.cos(thetaCM/2)**2
+    return Tx*(1 + math.sqrt(1 + 2*c2*mx/Tx))/2/c2
+
+
+@njit(cache=True,fastmath=True)
+def _dEv(Tx,mx,thetaCM):
+    """
+    dEv/dTx, dimensionless
+    """
+    c2 = math.cos(thetaCM/2)**2
+    x = mx/Tx
+    return (1 + (1 + c2*x)/math.sqrt(2*c2*x + 1))/2/c2
+
+
+@njit(cache=True,fastmath=True)
+def vBDM(Tx,mx):
+    """
+    BDM velocity in the unit of c
+    """
+    return math.sqrt(Tx*(Tx + 2*mx))/(Tx + mx)
+
+
+@njit(cache=True,fastmath=True)
+def supernovaNuFlux(Ev,l):
+    """
+    SN neutrino flux after propagating a distance l, #/Ev/cm^2/s
+    """
+    L = _Lv/(4*math.pi*(l*_kpc2cm)**2)
+    # Fermi-Dirac distributions as exp(-x)/(1 + exp(-x)), branch-free and
+    # underflowing to 0 for large x = Ev/Tv - 3. The fixed-length loop over
+    # the species can be unrolled and vectorized by LLVM
+    dist = 0.0
+    for k in range(3):
+        e = math.exp(3 - Ev/_Tv[k])
+        dist += _fvNorm[k]*e/(1 + e)
+    return L*Ev**2*dist
+
+
+
+##########################################################################
+#                                                                        #
+#   Galaxy population and cosmology                                      #
+#                                                                        #
+##########################################################################
+
+
+@njit(cache=True,fastmath=True)
+def _phi(alpha,Mc,phi0,M):
+    log_phi0 = math.log10(phi0) - 4
+    logln10 = 0.362216
+    logE = 0.43429
+    logphi = log_phi0 + logln10 + (M - Mc)*(1 + alpha) - _np.exp((M - Mc)*_LN10)*logE
+    return _np.exp(logphi*_LN10)
+
+
+@njit(cache=True,fastmath=True)
+def dnG(m,z):
+    """
+    Stellar mass function dnG/dm, # of galaxies per m per Mpc^3
+    """
+    if 0 <= z <= 0.7:
+        return _phi(-1.11,11.22,18.2,m)
+    elif 0.7 < z <= 1:
+        return _phi(-1.27,11.37,11.0,m)
+    elif 1 < z <= 1.4:
+        return _phi(-1.28,11.26,6.2,m)
+    elif 1.4 < z <= 1.8:
+        return _phi(-1.31,11.25,4.3,m)
+    elif 1.8 < z <= 2.2:
+        return _phi(-1.34,11.22,3.1,m)
+    elif 2.2 < z <= 2.6:
+        return _phi(-1.38,11.16,2.4,m)
+    elif 2.6 < z <= 3:
+        return _phi(-1.41,11.09,1.9,m)
+    elif 3 < z <= 3.5:
+        return _phi(-1.45,10.97,1.5,m)
+    elif 3.5 < z <= 4:
+        return _phi(-1.49,10.81,1.1,m)
+    elif 4 < z <= 4.5:
+        return _phi(-1.53,10.44,3.0,m)
+    elif 4.5 < z <= 5.5:
+        return _phi(-1.67,10.47,1.3,m)
+    elif 5.5 < z <= 6.5:
+        return _phi(-1.93,10.3,0.3,m)
+    elif 6.5 < z <= 8:
+        return _phi(-2.05,10.42,0.1,m)
+    else:
+        raise ValueError('Argument \'z\' is not in the valid range.')
+
+
+@njit(cache=True,fastmath=True)
+def _E(z):
+    y = (1 + z)
+    return _np.sqrt(_Omega_0m*y**3 + _Omega_0L)
+
+
+@njit(cache=True,fastmath=True)
+def rhoDotSFR(z):
+    """
+    Star formation rate at redshift z, Msun per year per Mpc^3
+    """
+    a,b,c = 3.4,-0.3,-3.5
+    z1,z2,eta = 1,4,-10
+    B = (1 + z1)**(1 - a/b)
+    C = (1 + z1)**((b - a)/c)*(1 + z2)**(1 - b/c)
+    Z = 1 + z
+    return 0.0178*(Z**(a*eta) + (Z/B)**(b*eta) + (Z/C)**(c*eta))**(1/eta)
+
+
+
+##########################################################################
+#                                                                        #
+#   Diffuse boosted dark matter                                          #
+#                                                                        #
+##########################################################################
+
+
+@njit(cache=True,fastmath=True,inline='always')
+def _diffSpectrum(Tx,mx,MG,R,l,theta,thetaCM,is_spike,is_ann,sigv,tBH,rhosMW,rsMW,eta,spikeTable):
+    """
+    dNx/dTx per unit differential DM-nu cross section, the constant
+    cross section is multiplied once by the callers
+    """
+    sinTheta = math.sin(theta)
+    r = math.hypot(l - R*math.cos(theta),R*sinTheta)  # _get_r, sharing sin(theta)
+    if 1e-10 <= r < 100:
+        Ev = snNuEenergy(Tx,mx,thetaCM)
+        dEvdTx = _dEv(Tx,mx,thetaCM)
+        vx = vBDM(Tx,mx)
+        nx = dmNumberDensity(r,mx,MG,is_spike,is_ann,sigv,tBH,rhosMW,rsMW,eta,spikeTable)
+        return l**2*sinTheta*math.sin(thetaCM)*nx*supernovaNuFlux(Ev,l)*(dEvdTx*vx)
+    else:
+        return 0.0
+
+
+@njit(cache=True,fastmath=True,inline='always')
+def _dbdmSpectrum(z,MG,Tx,mx,R,l,theta,thetaCM,tBH,areaDensity,is_spike,is_ann,is_weighted,sigv,rhosMW,rsMW,eta,spikeTable):
+    """
+    DBDM spectrum yielded by SN at position R, weighted by the galactic
+    area density areaDensity if is_weighted is True
+    """
+    Txp = (1 + z)*Tx
+    if Txp < 150:  # discard the BDM signature if it requires Ev > 150 MeV at z
+        m = math.log10(MG)
+        spectrum = dnG(m,z)*rhoDotSFR(z)*_diffSpectrum(Txp,mx,MG,R,l,theta,thetaCM,
+                                                       is_spike,is_ann,sigv,tBH,rhosMW,rsMW,eta,spikeTable)/_E(z)
+        if is_weighted:
+            spectrum *= (2*math.pi*R)*areaDensity/MG
+        return spectrum
+    else:
+        return 0.0
+
+
+@njit(cache=True,fastmath=True,inline='always')
+def _dbdmSample(i,z,MG,Tx,R,l,theta,thetaCM,tBH,areaDensity,mx,is_spike,is_ann,is_weighted,is_event,sigv,rhosMW,rsMW,eta,spikeTable):
+    """
+    _dbdmSpectrum on the sample i of a batch, multiplied by the BDM velocity if is_event
+    """
+    spectrum = _dbdmSpectrum(z[i],MG[i],Tx[i],mx,R[i],l[i],theta[i],thetaCM[i],tBH[i],areaDensity[i],
+                             is_spike,is_ann,is_weighted,sigv,rhosMW,rsMW,eta,spikeTable)
+    if is_event:
+        spectrum *= vBDM(Tx[i],mx)
+    return spectrum
+
+
+@njit(cache=True,fastmath=True,parallel=True)
+def _dbdmSpectrumBatch(z,MG,Tx,R,l,theta,thetaCM,tBH,areaDensity,mx,is_spike,is_ann,is_weighted,is_event,sigv,rhosMW,rsMW,eta,spikeTable):
+    """
+    Batch version of _dbdmSpectrum for vegas
+
+    In
+    ------
+    z,MG,Tx,R,l,theta,thetaCM: (n,) contiguous arrays of the samples, one per variable
+    tBH: (n,) array of SMBH ages, years
+    areaDensity: (n,) array of galactic area densities, Msun/kpc^2
+        Only used when is_weighted is True
+    is_ann: annihilation with sigv > 0, bool
+    is_event: multiplying the BDM velocity for event evaluation, bool
+    spikeTable: tabulated spike density, see _rhoSpikeAt
+
+    Out
+    ------
+    spectrum: (n,) array
+    """
+    n = z.shape[0]
+    out = _np.empty(n)
+    # one loop per DM density variant, the flags are constants inside each of them
+    if is_spike and is_ann:
+        for i in prange(n):
+            out[i] = _dbdmSample(i,z,MG,Tx,R,l,theta,thetaCM,tBH,areaDensity,mx,True,True,
+                                 is_weighted,is_event,sigv,rhosMW,rsMW,eta,spikeTable)
+    elif is_spike:
+        for i in prange(n):
+            out[i] = _dbdmSample(i,z,MG,Tx,R,l,theta,thetaCM,tBH,areaDensity,mx,True,False,
+                                 is_weighted,is_event,sigv,rhosMW,rsMW,eta,spikeTable)
+    else:
+        for i in prange(n):
+            out[i] = _dbdmSample(i,z,MG,Tx,R,l,theta,thetaCM,tBH,areaDensity,mx,False,False,
+                                 is_weighted,is_event,sigv,rhosMW,rsMW,eta,spikeTable)
+    return out
+
+
+@njit(cache=True,fastmath=True)
+def _dbdmSpectrumBatchSerial(z,MG,Tx,R,l,theta,thetaCM,tBH,areaDensity,mx,is_spike,is_ann,is_weighted,is_event,sigv,rhosMW,rsMW,eta,spikeTable):
+    """
+    Single-threaded _dbdmSpectrumBatch for vegas running with nproc > 1, where
+    the worker processes already occupy the cores and forking a process that
+    holds the numba thread pool is avoided
+    """
+    n = z.shape[0]
+    out = _np.empty(n)
+    if is_spike and is_ann:
+        for i in range(n):
+            out[i] = _dbdmSample(i,z,MG,Tx,R,l,theta,thetaCM,tBH,areaDensity,mx,True,True,
+                                 is_weighted,is_event,sigv,rhosMW,rsMW,eta,spikeTable)
+    elif is_spike:
+        for i in range(n):
+            out[i] = _dbdmSample(i,z,MG,Tx,R,l,theta,thetaCM,tBH,areaDensity,mx,True,False,
+                                 is_weighted,is_event,sigv,rhosMW,rsMW,eta,spikeTable)
+    else:
+        for i in range(n):
+            out[i] = _dbdmSample(i,z,MG,Tx,R,l,theta,thetaCM,tBH,areaDensity,mx,False,False,
+                                 is_weighted,is_event,sigv,rhosMW,rsMW,eta,spikeTable)
+    return out
@@ -12,11 +12,21 @@
 # GNU General Public License for more details.
 
 
+import math as _math
+import warnings as _warnings
 import numpy as _np
 import vegas as _vegas
+from scipy.stats import qmc as _qmc
+from . import _kernels
+try:
+    from . import _kernels_aot  # ahead-of-time build of the serial batch kernel, see _aot_kernels
+    if _kernels_aot.sourceHash() != _kernels._sourceHash():
+        _kernels_aot = None  # stale, built from other kernels or constants
+except (ImportError,AttributeError,OSError):
+    _kernels_aot = None
 from .sysmsg import FlagError
 from .constant import constant
-from .galDensity import galacticAreaDensityFit,galacticAreaDensity,cosmicAgeFit
+from .galDensity import galacticAreaDensity,cosmicAgeFit,_areaDensityGrid
 from .galMassFunction import dnG,_E,rhoDotSFR
 
 
@@ -28,6 +38,19 @@ from .galMassFunction import dnG,_E,rhoDotSFR
 ##########################################################################
 
 
+# ----- Compiled kernels on scalars and arrays -----
+
+def _elementwise(kernel,*args):
+    """
+    Evaluate the compiled scalar kernel on the float arguments, elementwise
+    if any of them is an array
+    """
+    if all(_np.ndim(arg) == 0 for arg in args):
+        return kernel(*[float(arg) for arg in args])
+    return _np.vectorize(kernel,otypes=[float])(*[_np.asarray(arg,dtype=float) for arg in args])
+
+
+
 # ----- Dark matter halo profile -----
 
 class haloSpike(constant):  
@@ -38,145 +61,31 @@ class haloSpike(constant):
         """
         pass
     
-    def _M_sigma(self,mBH):
-        """
-        Faber–Jackson law for black holes
-
-        In
-        ---
-        mBH: SMBH mass, Msun
-
-        Out
-        ---
-        sigma: stellar velocity dispersion, km/s
-        """
-        return 200*(mBH/1e8/1.9)**(1/5.1)
-    
-    def _rh(self,MG,eta):
-        """
-        SMBH influence radius
-
-        In
-        ---
-        MG: galactic mass, Msun
-        eta: the ratio of MG/Mhalo
-
-        Out
-        ---
-        rh: influence radisu, kpc
-        """
-        mBH = massBH(MG,eta)
-        sigma = self._M_sigma(mBH)
-        rh = self.G*mBH/sigma**2 # pc
-        return rh*1e-3 # kpc
-
-    def _normN(self,mBH,rh) -> float:
-        """
-        The normalization N
-        
-        In
-        ------
-        mBH: SMBH mass, Msun
-        rh: SMBH influence radius, kpc
-        
-        Out
-        ------
-        normalization N
-        """
-        Rs = radiusSchwarzschild(mBH)
-        ri = 4*Rs
-        alpha = 3/2
-        
-        def _fa(r,alpha):
-            return (r**3/(3 - alpha) + 12*Rs*r**2/(alpha - 2) - 48*Rs**2*r/(alpha - 1) + 64*Rs**3/alpha)/r**alpha
-
-        fh,fi = _fa(rh,alpha),_fa(ri,alpha)
-        norm = mBH*self.Msun/4/_np.pi/(fh - fi)
-        return norm
-
-    def _radiusSpike(self,mBH,rh,rhos,rs) -> float:
-        """
-        Get the spike radius
-
-        In
-        ------
-        mBH: SMBH mass, Msun
-        rh: SMBH influence radius, kpc
-        rhos: characteristic density, MeV/cm^3
-        rs: characteristic radius, kpc
-
-        Out
-        ------
-        R_spike: Spike radius, kpc
-        """
-        N = self._normN(mBH,rh)
-        rhos = rhos*self.kpc2cm**3
-        return (N/rhos/rs)**(3/4)*rh**(5/8)
-    
-    def _rhoPrime(self,r,mBH,rh,rhos,rs) -> float:
-        Rs = radiusSchwarzschild(mBH)
-        ri = 4*Rs
-        N = self._normN(mBH,rh)
-        Rsp = self._radiusSpike(mBH,rh,rhos,rs)
-        rhoN = N/rh**(3/2)
-        rhoNp = rhoN*(rh/Rsp)**(7/3)
-        if ri <= r < rh:
-            rhoP = rhoN*(1 - ri/r)**3*(rh/r)**(3/2)
-        else:
-            rhoP = rhoNp*(Rsp/r)**(7/3)
-        return rhoP/self.kpc2cm**3
-
-    def _nxSpike(self,r,mx,MG,sigv,tBH,rhosMW,rsMW,eta,rh) -> float:
+    def __call__(self,r,mx,MG,sigv,tBH,rhosMW,rsMW,eta):
         """
-        DM number density with spike in the center
+        DM number density with spike in the center, evaluated by the compiled kernel
 
         In
         ------
         r: distance to GC, kpc
         mx: DM mass, MeV
         MG: The galactic stellar mass, Msun
+            None implies MW case with the SMBH mass 4.3e6 Msun
         sigv: DM annihilation cross section, in the unit of 1e-26 cm^3/s
             None indicates no annihilation
-        tBH: SMBH age, default 1e9 years
+        tBH: SMBH age, years
         rhosMW: The MW characteristic density, MeV/cm^3
         rsMW: The MW characteristic radius, kpc
         eta: the ratio of MG/Mhalo
-        rh: SMBH influence radius, kpc
 
         Out
         ------
         density: #/cm^3
         """
-        #mHalo = eta*MG
-        mBH = massBH(MG,eta)
-        Rs = radiusSchwarzschild(mBH)
-        ri = 4*Rs
-        rs = get_rs(MG,rsMW)  # get the scaled rs from MG
-        
-        if sigv is None:
-            Rsp = self._radiusSpike(mBH,rh,rhosMW,rs)
-            if r < ri:
-                return 0
-            elif ri <= r < Rsp:
-                return self._rhoPrime(r,mBH,rh,rhosMW,rs)/mx
-            else:
-                return rhox(r,rhosMW,rs)/mx
-        else:
-            Rsp = self._radiusSpike(mBH,rh,rhosMW,rs)
-            sigv = sigv*1e-26
-            rhoc = mx/sigv/tBH/self.year2Seconds
-            if r < ri:
-                return 0
-            elif ri <= r < Rsp:
-                rhoP = self._rhoPrime(r,mBH,rh,rhosMW,rs)
-                return rhoP*rhoc/(rhoP + rhoc)/mx
-            else:
-                rhoDM = rhox(r,rhosMW,rs)
-                return rhoDM*rhoc/(rhoDM + rhoc)/mx
-    
-    def __call__(self,r,mx,MG,sigv,tBH,rhosMW,rsMW,eta):
-        rh = self._rh(MG,eta) # SMBH influence radius in kpc
-        return self._nxSpike(r,mx,MG,sigv,tBH,rhosMW,rsMW,eta,rh)
+        # massBH and get_rs resolve MG = None to the MW values
+        mBH,rs = massBH(MG,eta),get_rs(MG,rsMW)
+        sigv = 0.0 if sigv is None else sigv  # sigv <= 0 means no annihilation in the kernel
+        return _elementwise(_kernels._nxSpike,r,mx,mBH,rs,sigv,tBH,rhosMW)
 
 
 def rhox(r,rhos,rs) -> float:
@@ -193,8 +102,7 @@ def rhox(r,rhos,rs) -> float:
     ------
     rhox: DM density at r, MeV/cm^3
     """
-    rr = r/rs
-    return rhos/(rr*(1 + rr)**2)
+    return _kernels.rhox(r,rhos,rs)
 
 
 def get_rmax(MG) -> float:
@@ -231,7 +139,7 @@ def get_rs(MG,rsMW=24.42) -> float:
     if MG is None:
         return rsMW
     else:
-        return (MG/constant.Mmw)**(1/3)*rsMW
+        return _kernels.get_rs(MG,rsMW)
 
 
 def nxNFW(r,mx,rhosMW=184,rsMW=24.42,MG=None) -> float:
@@ -254,10 +162,9 @@ def nxNFW(r,mx,rhosMW=184,rsMW=24.42,MG=None) -> float:
     number density: per cm^3
     """
     if MG is None:
-        return rhox(r,rhosMW,rsMW)/mx
+        return _kernels.rhox(r,rhosMW,rsMW)/mx
     else:
-        rs = get_rs(MG,rsMW)
-        return rhox(r,rhosMW,rs)/mx
+        return _kernels._nxNFW(r,mx,MG,rhosMW,rsMW)
 
 
 def massBH(MG,eta=24.38) -> float:
@@ -278,7 +185,7 @@ def massBH(MG,eta=24.38) -> float:
         # MW case
         return 4.3e6
     else:
-        return 7e7*(eta*MG/1e12)**(4/3)
+        return _kernels.massBH(MG,eta)
 
 
 def radiusSchwarzschild(mBH) -> float:
@@ -293,9 +200,11 @@ def radiusSchwarzschild(mBH) -> float:
     ------
     Rs: Schwarzschild radius, kpc
     """
-    mBH = mBH*constant.Msun_kg
-    Rs = mBH*1.48e-25/constant.kpc2cm  # convert Rs into kpc
-    return Rs
+    return _kernels.radiusSchwarzschild(mBH)
+
+
+# haloSpike is stateless, share a single instance instead of creating one per call
+_haloSpike = haloSpike()
 
 
 def dmNumberDensity(r,mx,MG,is_spike=True,sigv=None,tBH=1e10,rhosMW=184,rsMW=24.42,eta=24.3856) -> float:
@@ -320,8 +229,7 @@ def dmNumberDensity(r,mx,MG,is_spike=True,sigv=None,tBH=1e10,rhosMW=184,rsMW=24.
     number density: 1/cm^3
     """
     if is_spike is True:
-        nx = haloSpike()
-        return nx(r,mx,MG,sigv,tBH,rhosMW,rsMW,eta)
+        return _haloSpike(r,mx,MG,sigv,tBH,rhosMW,rsMW,eta)
     elif is_spike is False:       
         return nxNFW(r,mx,rhosMW,rsMW,MG)
     else:
@@ -345,7 +253,7 @@ def _get_r(l,R,theta) -> float:
     ------
     r: kpc
     """
-    return _np.sqrt(l**2 + R**2 - 2*l*R*_np.cos(theta))
+    return _np.hypot(l - R*_np.cos(theta),R*_np.sin(theta))
 
 
 def snNuEenergy(Tx,mx,thetaCM) -> float:
@@ -401,25 +309,6 @@ def vBDM(Tx,mx) -> float:
     return _np.sqrt(Tx*(Tx + 2*mx))/(Tx + mx)
 
 
-#def dsigma0(Ev,thetaCM) -> float:
-#    """
-#    Differential DM-neutrino scattering cross section in CM frame
-#    
-#    In
-#    ------
-#    Ev: incoming SN neutrino energy, MeV
-#    thetaCM: Scattering angle in CM frame, rad
-#    
-#    Out
-#    ------
-#    dsigma0: cm^2 per steradian
-#    """
-#    # this is energy-independent cross section
-#    # divided by 4*np implying isotropic in CM frame
-#    return print('Academics is a place full of PUA!')
-#    return 1e-35
-
-
 def supernovaNuFlux(Ev,l,is_density=False) -> float:
     """
     SN neutrino flux after propagating a distance l
@@ -435,26 +324,7 @@ def supernovaNuFlux(Ev,l,is_density=False) -> float:
     flux: #/Ev/cm^2/s, if is_density is False
     number density: #/Ev/cm^3, if is_density is True
     """
-    Lv = constant.Lv*constant.erg2MeV
-    l = l*constant.kpc2cm
-    
-    #Fermi-Dirac distribution
-    def _fv(Ev,Tv):
-        exponent = Ev/Tv - 3
-        # setup a cutoff value when the exponent beyon the validatiy of float64
-        if exponent <= 709.782:
-            return (1/18.9686)*Tv**(-3)*(Ev**2/(_np.exp(exponent) + 1))
-        else:
-            return 0
-    
-    # distributions for nu_e and anti-nu_e
-    nue_dist = _fv(Ev,2.76)/11
-    nueb_dist = _fv(Ev,4.01)/16
-    # distributions for the rest 4 species
-    nux_dist = _fv(Ev,6.26)/25
-    
-    L = Lv/(4*_np.pi*l**2)
-    flux = L*(nue_dist + nueb_dist + 4*nux_dist)
+    flux = _elementwise(_kernels.supernovaNuFlux,Ev,l)
     if is_density is False:
         return flux
     elif is_density is True:
@@ -473,18 +343,15 @@ class dbdmSpectrum(constant):
     
     def _diffSpectrum(self,Tx,mx,MG,R,l,theta,thetaCM,is_spike,sigv,tBH,rhosMW,rsMW,eta):
         """
-        dNx/dTx
+        dNx/dTx, evaluated by the compiled kernel
         """
-        r = _get_r(l,R,theta)
-        if 1e-10 <= r < 100:
-            Ev = snNuEenergy(Tx,mx,thetaCM)
-            dEvdTx = _dEv(Tx,mx,thetaCM)
-            vx = vBDM(Tx,mx)  #  
-            nx = dmNumberDensity(r,mx,MG,is_spike,sigv,tBH,rhosMW,rsMW,eta)
-            dsigma0 = constant.sigma0  # differential DM-nu cross section in CM frame, cm^2/sr
-            return l**2*_np.sin(theta)*_np.sin(thetaCM)*nx*dsigma0*supernovaNuFlux(Ev,l)*(dEvdTx*vx)
-        else:
-            return 0
+        if is_spike is not True and is_spike is not False:
+            raise FlagError('Flag \'is_spike\' must be a boolean.')
+        sigv = 0.0 if sigv is None else float(sigv)
+        # the kernel leaves out the differential DM-nu cross section in CM frame, cm^2/sr
+        return constant.sigma0*_kernels._diffSpectrum(float(Tx),float(mx),float(MG),float(R),float(l),float(theta),float(thetaCM),
+                                                      bool(is_spike),sigv > 0,sigv,float(tBH),float(rhosMW),float(rsMW),float(eta),
+                                                      _kernels._noSpikeTable)
     
     def _dbdmSpectrum(self,z,MG,Tx,mx,R,l,theta,thetaCM,is_spike,sigv,rhosMW,rsMW,eta) -> float:
         """
@@ -493,7 +360,7 @@ class dbdmSpectrum(constant):
         Txp = (1 + z)*Tx 
         tBH = cosmicAgeFit(z)*1e9 # convert to years
         if Txp < 150:  # discard the BDM signature if it requires Ev > 150 MeV at z 
-            m = _np.log10(MG)
+            m = _math.log10(MG)
             return dnG(m,z)*rhoDotSFR(z)*self._diffSpectrum(Txp,mx,
                                                             MG,R,l,theta,
                                                             thetaCM,
@@ -509,9 +376,9 @@ class dbdmSpectrum(constant):
         tBH = cosmicAgeFit(z)*1e9 # convert to years
         if Txp < 150:  # discard the BDM signature if it requires Ev > 130 MeV at z
             # adopt fitting data for galactic area density?
-            m = _np.log10(MG)
+            m = _math.log10(MG)
             if usefit is True:
-                galArealDensity = galacticAreaDensityFit((R,m))
+                galArealDensity = _kernels._interpGrid(float(R),m,*_areaDensityGrid)
             elif usefit is False:
                 galArealDensity = galacticAreaDensity(R,zRange=[-10,10],MG=MG)
             else:
@@ -532,10 +399,234 @@ class dbdmSpectrum(constant):
             raise FlagError('Flag \'is_weighted\' must be a boolean.')
 
 
+# set once a parallel kernel has started the numba thread pool in this process,
+# vegas must not fork its workers after that or the interpreter hangs at exit
+_isThreadPoolStarted = False
+
+
+def _checkNproc(nproc):
+    """
+    Number of vegas processes that is safe to use in this process
+
+    In
+    ------
+    nproc: Number of processes requested for vegas
+
+    Out
+    ------
+    nproc: 1 if the numba thread pool is already running, otherwise the input
+    """
+    if nproc > 1 and _isThreadPoolStarted is True:
+        _warnings.warn('The numba thread pool is already running in this process and cannot be forked '
+                       'safely, falling back to nproc = 1.',RuntimeWarning,stacklevel=3)
+        return 1
+    return nproc
+
+
+class _dbdmBatchSpectrum(_vegas.BatchIntegrand):
+    
+    def __init__(self,Tx,mx,R,is_spike,is_average,sigv,rhosMW,rsMW,eta,usefit,nproc=1,usetable=False):
+        """
+        Batch integrand for vegas that evaluates the DBDM spectrum on all
+        samples at once with the compiled kernel
+
+        In
+        ------
+        Tx: BDM kinetic energy, MeV
+            None indicates Tx is the last integration variable, e.g. event
+        nproc: Number of vegas processes, the kernel runs single-threaded
+            in each of them if nproc > 1
+        usetable: Interpolate the spike density from a table, bool
+        Other inputs are the same as flux
+        """
+        if is_spike is not True and is_spike is not False:
+            raise FlagError('Flag \'is_spike\' must be a boolean.')
+        if is_average is True and usefit is not True and usefit is not False:
+            raise FlagError('Flag \'usefit\' must be a boolean.')
+        if usetable is not True and usetable is not False:
+            raise FlagError('Flag \'usetable\' must be a boolean.')
+        self.Tx = None if Tx is None else float(Tx)
+        self.mx = float(mx)
+        self.R = float(R)
+        self.is_average = is_average
+        self.sigv = 0.0 if sigv is None else float(sigv)
+        self.is_spike = is_spike
+        self.is_ann = self.sigv > 0  # the kernel is specialized on (is_spike,is_ann)
+        self.rhosMW = float(rhosMW)
+        self.rsMW = float(rsMW)
+        self.eta = float(eta)
+        self.usefit = usefit
+        self.is_parallel = nproc == 1
+        if usetable is True and is_spike is True:
+            self.spikeTable = _getSpikeTable(self.rhosMW,self.rsMW,self.eta,self.is_parallel)
+        else:
+            self.spikeTable = _kernels._noSpikeTable
+    
+    def __call__(self,x):
+        # rearrange the samples into columns (z,MG,Tx,R,l,theta,thetaCM)
+        x = _np.asarray(x)
+        N = x.shape[0]
+        # columns of x are (z,MG,R,l,theta,thetaCM[,Tx]) or (z,MG,l,theta,thetaCM[,Tx])
+        k = 2 if self.is_average is True else 1
+        z,MG = x[:,0],x[:,1]
+        R = x[:,2] if self.is_average is True else _np.full(N,self.R)
+        l,theta,thetaCM = x[:,k + 1],x[:,k + 2],x[:,k + 3]
+        Tx = x[:,-1] if self.Tx is None else _np.full(N,self.Tx)
+        
+        # discard the samples outside 1e-10 <= r < 100 kpc or requiring Ev > 150 MeV
+        # before evaluating anything on them, and gather the rest into one contiguous
+        # array per variable for the kernel
+        r = _np.hypot(l - R*_np.cos(theta),R*_np.sin(theta))
+        idx = _np.flatnonzero(((1 + z)*Tx < 150) & (r >= 1e-10) & (r < 100))
+        z,MG,Tx,R,l,theta,thetaCM = [_np.ascontiguousarray(v[idx]) for v in (z,MG,Tx,R,l,theta,thetaCM)]
+        
+        tBH = cosmicAgeFit(z)*1e9 # convert to years
+        if self.is_average is False:
+            areaDensity = _np.zeros(idx.size)
+        elif self.usefit is True:
+            areaDensity = _kernels._areaDensityBatch(R,_np.log10(MG),*_areaDensityGrid)
+        else:
+            areaDensity = _np.array([galacticAreaDensity(R[i],zRange=[-10,10],MG=MG[i]) for i in range(idx.size)])
+        args = (z,MG,Tx,R,l,theta,thetaCM,tBH,areaDensity,self.mx,self.is_spike,self.is_ann,self.is_average,
+                self.Tx is None,self.sigv,self.rhosMW,self.rsMW,self.eta)
+        spectrum = _np.zeros(N)
+        if self.is_parallel:
+            global _isThreadPoolStarted
+            _isThreadPoolStarted = True
+            spectrum[idx] = _kernels._dbdmSpectrumBatch(*args,self.spikeTable)
+        elif _kernels_aot is not None:
+            # the exported signature reads every array as contiguous float64
+            aotArgs = [_np.ascontiguousarray(v,dtype=float) if isinstance(v,_np.ndarray) else v for v in args + self.spikeTable]
+            spectrum[idx] = _kernels_aot.dbdmSpectrumBatchSerial(*aotArgs)
+        else:
+            spectrum[idx] = _kernels._dbdmSpectrumBatchSerial(*args,self.spikeTable)
+        return spectrum
+
+
+# vegas integrators adapted by flux and event with usecache = True, keyed on the
+# integration domain and the model parameters, and the spike tables of usetable = True
+# keyed on (rhosMW,rsMW,eta). They are kept until clearCache
+_integrators = {}
+_spikeTables = {}
+
+
+def clearCache():
+    """
+    Drop the vegas integrators kept by flux and event with usecache = True
+    and the spike tables kept with usetable = True
+    """
+    _integrators.clear()
+    _spikeTables.clear()
+
+
+def _getSpikeTable(rhosMW,rsMW,eta,is_parallel):
+    """
+    Get the tabulated spike density, see _kernels._rhoSpikeAt, building it on first use
+
+    In
+    ------
+    rhosMW,rsMW,eta: The halo parameters as in flux, floats
+    is_parallel: Build the table with the numba thread pool, bool
+        False in a process that vegas forks afterwards
+
+    Out
+    ------
+    tuple: (table,u0,du,lnMG0,dlnMG)
+    """
+    key = (rhosMW,rsMW,eta)
+    if key not in _spikeTables:
+        # the table spans the MG range integrated in flux and event, and
+        # u = log(r/ri - 1) from r = (1 + 1e-8)*ri to r = 100 kpc for the lightest galaxy
+        riMin = 4*radiusSchwarzschild(massBH(1e6,eta))
+        u = _np.linspace(_np.log(1e-8),_np.log(100/riMin - 1),512)
+        lnMG = _np.linspace(_np.log(1e6),_np.log(1e12),256)
+        if is_parallel is True:
+            global _isThreadPoolStarted
+            _isThreadPoolStarted = True
+            table = _kernels._rhoSpikeTable(u,lnMG,rhosMW,rsMW,eta)
+        else:
+            table = _kernels._rhoSpikeTableSerial(u,lnMG,rhosMW,rsMW,eta)
+        _spikeTables[key] = (table,u[0],u[1] - u[0],lnMG[0],lnMG[1] - lnMG[0])
+    return _spikeTables[key]
+
+
+def _getIntegrator(domain,params,nproc,usecache):
+    """
+    Get the vegas integrator over domain
+
+    In
+    ------
+    domain: list of [min,max] for each variable
+    params: tuple of the flux or event arguments that shape the integrand, Tx excluded
+    nproc: Number of processes for vegas
+    usecache: Reuse the integrator adapted by an earlier call with the same
+        domain and params, bool
+
+    Out
+    ------
+    tuple: (integrator, bool indicating whether its grid is already adapted)
+    """
+    key = (tuple(tuple(bounds) for bounds in domain),params)
+    if usecache is True:
+        if key in _integrators:
+            return _integrators[key],True
+        integrator = _vegas.Integrator(domain,nproc=nproc)
+        _integrators[key] = integrator
+        return integrator,False
+    elif usecache is False:
+        return _vegas.Integrator(domain,nproc=nproc),False
+    else:
+        raise FlagError('Flag \'usecache\' must be a boolean.')
+
+
+def _integrate(spectrum,domain,params,method,nitn,neval,nproc,usecache,seed=None):
+    """
+    Integrate spectrum over domain with vegas or quasi-Monte Carlo and return
+    the mean. An already adapted vegas grid is sampled as it is for half of
+    the iterations
+    """
+    if method == 'vegas':
+        integrator,is_adapted = _getIntegrator(domain,params,nproc,usecache)
+        try:
+            if is_adapted is True:
+                return integrator(spectrum,nitn=max(nitn//2,1),neval=neval,adapt=False,nproc=nproc).mean
+            else:
+                return integrator(spectrum,nitn=nitn,neval=neval).mean
+        finally:
+            integrator.set(nproc=1)  # release the worker processes, if any
+    elif method == 'sobol':
+        return _integrateSobol(spectrum,domain,nitn,neval,seed)
+    else:
+        raise ValueError('Argument \'method\' must be either \'vegas\' or \'sobol\'.')
+
+
+def _integrateSobol(spectrum,domain,nitn,neval,seed=None):
+    """
+    Randomized quasi-Monte Carlo integration of spectrum over domain
+
+    MG, the second variable, is sampled uniformly in log10(MG) with the Jacobian
+    MG*ln(10). Each of the nitn chains is an independent scrambling of
+    2^ceil(log2(neval)) Sobol points drawn from a generator seeded with seed,
+    and the mean over the chains is returned
+    """
+    rng = _np.random.default_rng(seed)
+    lower,upper = _np.array(domain,dtype=float).T
+    lower[1],upper[1] = _np.log10(lower[1]),_np.log10(upper[1])
+    volume = _np.prod(upper - lower)
+    m = int(_np.ceil(_np.log2(neval)))
+    result = 0
+    for _ in range(nitn):
+        x = _qmc.scale(_qmc.Sobol(d=lower.size,scramble=True,seed=rng).random_base2(m),lower,upper)
+        MG = 10**x[:,1]
+        x[:,1] = MG
+        result += volume*_np.mean(spectrum(x)*MG)*_np.log(10)
+    return result/nitn
+
+
 def flux(Tx,mx,
          R=0,Rmax=30,rmax=30,tau=10,is_spike=True,is_average=True,
          sigv=None,rhosMW=184,rsMW=24.42,eta=24.3856,usefit=True,
-         nitn=10,neval=50000):
+         nitn=10,neval=50000,nproc=1,usetable=False,usecache=False,method='vegas',seed=None):
     """
     DBDM flux for given (Tx,mx) assuming isotropic and energy-independent
     differential DM-nuetrino cross section in CM frame with the value
@@ -559,6 +650,27 @@ def flux(Tx,mx,
     eta: Mmw/Mhalo for MW
     nitn: Number of chains in vegas
     neval: Number of evaluation in each MCMC chain
+    nproc: Number of processes for vegas to evaluate the integrand in parallel
+        With nproc = 1 each batch is spread over all cores by the compiled
+        kernel. Keep it 1 when calling inside a multiprocessing pool. Falls
+        back to 1 with a RuntimeWarning once an earlier call with nproc = 1
+        has started the thread pool, which cannot be forked
+    usetable: Interpolate the spike density from a 512x256 table in (r,MG)
+        instead of evaluating it for every sample, bool. The interpolation is
+        approximate: the pointwise error reaches about 12% across the spike
+        radius Rsp, where the density is discontinuous, and is about 0.16% at
+        the 99th percentile of the samples. The table is built once per
+        (rhosMW,rsMW,eta) and kept until clearCache() is called
+    usecache: Reuse the vegas grid adapted by an earlier call with the same
+        arguments, Tx aside, bool. The reused grid is not adapted further and
+        is sampled for nitn//2 chains only. One grid is kept per combination
+        of the other arguments until clearCache() is called
+    method: 'vegas' for adaptive Monte Carlo or 'sobol' for quasi-Monte Carlo
+        with nitn scramblings of 2^ceil(log2(neval)) Sobol points. nproc and
+        usecache only apply to 'vegas'. Without the adaptation 'sobol' is only
+        competitive for smooth integrands, e.g. is_spike = False
+    seed: Seed of the Sobol scramblings, the same seed reproduces the 'sobol'
+        result. None draws fresh scramblings on every call
     
     Out
     ------
@@ -566,29 +678,28 @@ def flux(Tx,mx,
     """
     preFactor = constant.MagicalNumber  # constant.D_H0*0.017/constant.Mmw/rhoDotSFR(0)/1e6/constant.kpc2cm**2/constant.year2Seconds
                                         # 0.017: SN in MW per year; 1e6: converting Mpc^2 to kpc^2
+    preFactor *= constant.sigma0        # differential DM-nu cross section in CM frame, cm^2/sr
     lmax = Rmax + rmax
-    spectrum  = dbdmSpectrum()
     if is_average is True:
-        integrator = _vegas.Integrator([[0,8],[1e6,1e12],[0,Rmax],[0,lmax],[0,_np.pi],[0,_np.pi]]) #(z,m,R,l,theta,thetaCM)
-        result = integrator(lambda x: spectrum(z=x[0],MG=x[1],Tx=Tx,mx=mx,R=x[2],l=x[3],theta=x[4],thetaCM=x[5],
-                                               is_spike=is_spike,is_weighted=is_average,sigv=sigv,
-                                               rhosMW=rhosMW,rsMW=rsMW,eta=eta,usefit=usefit),nitn=nitn,neval=neval).mean
-        flux = 4*_np.pi**2*tau*result*constant.kpc2cm**3*vBDM(Tx,mx)*preFactor
+        domain = [[0,8],[1e6,1e12],[0,Rmax],[0,lmax],[0,_np.pi],[0,_np.pi]] #(z,m,R,l,theta,thetaCM)
     elif is_average is False:
-        integrator = _vegas.Integrator([[0,8],[1e6,1e12],[0,lmax],[0,_np.pi],[0,_np.pi]]) #(z,m,l,theta,thetaCM)
-        result = integrator(lambda x: spectrum(z=x[0],MG=x[1],Tx=Tx,mx=mx,R=R,l=x[2],theta=x[3],thetaCM=x[4],
-                                               is_spike=is_spike,is_weighted=is_average,sigv=sigv,
-                                               rhosMW=rhosMW,rsMW=rsMW,eta=eta,usefit=usefit),nitn=nitn,neval=neval).mean
-        flux = 4*_np.pi**2*tau*result*constant.kpc2cm**3*vBDM(Tx,mx)*preFactor
+        domain = [[0,8],[1e6,1e12],[0,lmax],[0,_np.pi],[0,_np.pi]] #(z,m,l,theta,thetaCM)
     else:
         raise FlagError('Flag \'is_average\' must be a boolean.')
+    if method == 'sobol':
+        nproc = 1  # sobol never forks, its batches are spread over all cores by the compiled kernel
+    nproc = _checkNproc(nproc)
+    spectrum = _dbdmBatchSpectrum(Tx,mx,R,is_spike,is_average,sigv,rhosMW,rsMW,eta,usefit,nproc,usetable)
+    params = (mx,R,is_spike,sigv,rhosMW,rsMW,eta,usefit,usetable)
+    result = _integrate(spectrum,domain,params,method,nitn,neval,nproc,usecache,seed)
+    flux = 4*_np.pi**2*tau*result*constant.kpc2cm**3*vBDM(Tx,mx)*preFactor
     return flux
 
 
 def event(mx,
           TxRange=[5,30],R=0,Rmax=30,rmax=30,tau=10,is_spike=True,is_average=True,
           sigv=None,rhosMW=184,rsMW=24.42,eta=24.3856,usefit=True,
-          nitn=10,neval=50000):
+          nitn=10,neval=50000,nproc=1,usetable=False,usecache=False,method='vegas',seed=None):
     """
     DBDM event per electron per second for given mx assuming isotropic
     and energy-independent differential DM-nuetrino cross section in CM
@@ -614,6 +725,27 @@ def event(mx,
     eta: Mmw/Mhalo for MW
     nitn: Number of chains in vegas
     neval: Number of evaluation in each MCMC chain
+    nproc: Number of processes for vegas to evaluate the integrand in parallel
+        With nproc = 1 each batch is spread over all cores by the compiled
+        kernel. Keep it 1 when calling inside a multiprocessing pool. Falls
+        back to 1 with a RuntimeWarning once an earlier call with nproc = 1
+        has started the thread pool, which cannot be forked
+    usetable: Interpolate the spike density from a 512x256 table in (r,MG)
+        instead of evaluating it for every sample, bool. The interpolation is
+        approximate: the pointwise error reaches about 12% across the spike
+        radius Rsp, where the density is discontinuous, and is about 0.16% at
+        the 99th percentile of the samples. The table is built once per
+        (rhosMW,rsMW,eta) and kept until clearCache() is called
+    usecache: Reuse the vegas grid adapted by an earlier call with the same
+        arguments, bool. The reused grid is not adapted further and is
+        sampled for nitn//2 chains only. One grid is kept per combination of
+        the arguments until clearCache() is called
+    method: 'vegas' for adaptive Monte Carlo or 'sobol' for quasi-Monte Carlo
+        with nitn scramblings of 2^ceil(log2(neval)) Sobol points. nproc and
+        usecache only apply to 'vegas'. Without the adaptation 'sobol' is only
+        competitive for smooth integrands, e.g. is_spike = False
+    seed: Seed of the Sobol scramblings, the same seed reproduces the 'sobol'
+        result. None draws fresh scramblings on every call
     
     Out
     ------
@@ -621,22 +753,19 @@ def event(mx,
     """
     preFactor = constant.MagicalNumber     # constant.D_H0*0.017/constant.Mmw/rhoDotSFR(0)/1e6/constant.kpc2cm**2/constant.year2Seconds
     preFactor *= constant.sigma0*4*_np.pi  # multiplying total DM-electron cross section
+    preFactor *= constant.sigma0           # differential DM-nu cross section in CM frame, cm^2/sr
     lmax = Rmax + rmax
-    spectrum  = dbdmSpectrum()
     if is_average is True:
-        integrator = _vegas.Integrator([[0,8],[1e6,1e12],[0,Rmax],[0,lmax],[0,_np.pi],[0,_np.pi],TxRange]) #(z,m,R,l,theta,thetaCM)
-        result = integrator(lambda x: spectrum(z=x[0],MG=x[1],Tx=x[6],mx=mx,R=x[2],l=x[3],theta=x[4],thetaCM=x[5],
-                                               is_spike=is_spike,is_weighted=is_average,sigv=sigv,
-                                               rhosMW=rhosMW,rsMW=rsMW,eta=eta,usefit=usefit)*vBDM(Tx=x[6],mx=mx),
-                            nitn=nitn,neval=neval).mean
-        event = 4*_np.pi**2*tau*result*constant.kpc2cm**3*preFactor
+        domain = [[0,8],[1e6,1e12],[0,Rmax],[0,lmax],[0,_np.pi],[0,_np.pi],TxRange] #(z,m,R,l,theta,thetaCM,Tx)
     elif is_average is False:
-        integrator = _vegas.Integrator([[0,8],[1e6,1e12],[0,lmax],[0,_np.pi],[0,_np.pi],TxRange]) #(z,m,l,theta,thetaCM,Tx)
-        result = integrator(lambda x: spectrum(z=x[0],MG=x[1],Tx=x[5],mx=mx,R=R,l=x[2],theta=x[3],thetaCM=x[4],
-                                               is_spike=is_spike,is_weighted=is_average,sigv=sigv,
-                                               rhosMW=rhosMW,rsMW=rsMW,eta=eta,usefit=usefit)*vBDM(Tx=x[5],mx=mx),
-                            nitn=nitn,neval=neval).mean
-        event = 4*_np.pi**2*tau*result*constant.kpc2cm**3*preFactor
+        domain = [[0,8],[1e6,1e12],[0,lmax],[0,_np.pi],[0,_np.pi],TxRange] #(z,m,l,theta,thetaCM,Tx)
     else:
         raise FlagError('Flag \'is_average\' must be a boolean.')
+    if method == 'sobol':
+        nproc = 1  # sobol never forks, its batches are spread over all cores by the compiled kernel
+    nproc = _checkNproc(nproc)
+    spectrum = _dbdmBatchSpectrum(None,mx,R,is_spike,is_average,sigv,rhosMW,rsMW,eta,usefit,nproc,usetable)
+    params = (mx,R,is_spike,sigv,rhosMW,rsMW,eta,usefit,usetable)
+    result = _integrate(spectrum,domain,params,method,nitn,neval,nproc,usecache,seed)
+    event = 4*_np.pi**2*tau*result*constant.kpc2cm**3*preFactor
     return event
\ No newline at end of file
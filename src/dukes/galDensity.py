@@ -53,6 +53,7 @@ _rho_b0Fit = _CubicSpline(_MG_density_data,_rho_b0_data)
 _Sigma0ThinFit = _CubicSpline(_MG_density_data,_Sigma0Thin_data)
 _Sigma0ThickFit = _CubicSpline(_MG_density_data,_Sigma0Thick_data)
 galacticAreaDensityFit = _RegularGridInterpolator((_R_data,_MG_area_data),_rho_data)
+_areaDensityGrid = (_np.array(_R_data,dtype=float),_np.array(_MG_area_data,dtype=float),_np.array(_rho_data,dtype=float))  # for the compiled kernels
 cosmicAgeFit = _CubicSpline(_z_data,_age_data)
 
 
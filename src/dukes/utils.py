@@ -25,6 +25,7 @@ where funcname is the name of the desired class or function.
 
 """
 
+import math as _math
 import numpy as _np
 import vegas as _vegas
 from .dukesMain import constant,snNuEenergy,_get_r,_dEv,vBDM,dmNumberDensity,FlagError,supernovaNuFlux
@@ -143,7 +144,7 @@ class userPhenoModelInterface(constant):
             vx = vBDM(Tx,mx)  #  
             nx = dmNumberDensity(r,mx,MG,is_spike,sigv,tBH,rhosMW,rsMW,eta)
             dsigma0 = self.dsigmaNu(Ev,mx,thetaCM_vx) #self.dsigmaNu(Ev,mx,thetaCM_vx)
-            return l**2*_np.sin(theta)*_np.sin(thetaCM_vx)*nx*dsigma0*supernovaNuFlux(Ev,l)*(dEvdTx*vx)
+            return l**2*_math.sin(theta)*_math.sin(thetaCM_vx)*nx*dsigma0*supernovaNuFlux(Ev,l)*(dEvdTx*vx)
         else:
             return 0
     
@@ -154,7 +155,7 @@ class userPhenoModelInterface(constant):
         Txp = (1 + z)*Tx
         tBH = cosmicAgeFit(z)*1e9 # convert to years 
         if Txp < 150:  # discard the BDM signature if it requires Ev > 150 MeV at z 
-            m = _np.log10(MG)
+            m = _math.log10(MG)
             return dnG(m,z)*rhoDotSFR(z)*self._diffSpectrum(Txp,mx,
                                                             MG,R,l,theta,
                                                             thetaCM_vx,
@@ -170,7 +171,7 @@ class userPhenoModelInterface(constant):
         tBH = cosmicAgeFit(z)*1e9 # convert to years 
         if Txp < 150:  # discard the BDM signature if it requires Ev > 150 MeV at z
             # adopt fitting data for galactic area density?
-            m = _np.log10(MG)
+            m = _math.log10(MG)
             if usefit is True:
                 galArealDensity = galacticAreaDensityFit((R,m))
             elif usefit is False:
@@ -274,14 +275,14 @@ class userPhenoModelInterface(constant):
             integrator = _vegas.Integrator([[0,8],[1e6,1e12],[0,Rmax],[0,lmax],[0,_np.pi],[0,_np.pi],[0,_np.pi],TxRange]) #(z,m,R,l,theta,thetaCM_vx,thetaCM_xe,Tx)
             result = integrator(lambda x: self._dbdmSpectrumWeighted(z=x[0],MG=x[1],Tx=x[7],mx=mx,R=x[2],l=x[3],theta=x[4],thetaCM_vx=x[5],  
                                                is_spike=is_spike,sigv=sigv,         
-                                               rhosMW=rhosMW,rsMW=rsMW,eta=eta,usefit=usefit)*vBDM(Tx=x[7],mx=mx)*self.dsigmaE(x[7],mx,x[6])*_np.sin(x[6]), 
+                                               rhosMW=rhosMW,rsMW=rsMW,eta=eta,usefit=usefit)*vBDM(Tx=x[7],mx=mx)*self.dsigmaE(x[7],mx,x[6])*_math.sin(x[6]), 
                             nitn=nitn,neval=neval).mean
             event = 4*_np.pi**2*tau*result*self.kpc2cm**3*preFactor*(2*_np.pi)  # the last 2pi is due to diff cross section for DM-e is independent of azimuthal angle 
         elif is_average is False:
             integrator = _vegas.Integrator([[0,8],[1e6,1e12],[0,lmax],[0,_np.pi],[0,_np.pi],[0,_np.pi],TxRange]) #(z,m,l,theta,thetaCM,thetaCM_xe,Tx)
             result = integrator(lambda x: self._dbdmSpectrum(z=x[0],MG=x[1],Tx=x[6],mx=mx,R=R,l=x[2],theta=x[3],thetaCM_vx=x[4],     
                                                is_spike=is_spike,sigv=sigv,         
-                                               rhosMW=rhosMW,rsMW=rsMW,eta=eta)*vBDM(Tx=x[6],mx=mx)*self.dsigmaE(x[6],mx,x[5])*_np.sin(x[5]), 
+                                               rhosMW=rhosMW,rsMW=rsMW,eta=eta)*vBDM(Tx=x[6],mx=mx)*self.dsigmaE(x[6],mx,x[5])*_math.sin(x[5]), 
                                 nitn=nitn,neval=neval).mean
             event = 4*_np.pi**2*tau*result*self.kpc2cm**3*preFactor*(2*_np.pi)  # the last 2pi is due to diff cross section for DM-e is independent of azimuthal angle 
         else:
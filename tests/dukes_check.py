@@ -0,0 +1,185 @@
+# dukes_check.py
+#
+# Checks of the compiled integrand against values pinned from the original
+# Python implementation, followed by checks of the flux and event options
+# against the default evaluation
+#
+#     python tests/dukes_check.py
+
+import warnings
+import numpy as np
+import dukes
+from dukes import _kernels
+from dukes.dukesMain import _dbdmBatchSpectrum,_getSpikeTable
+
+
+# (z,MG,R,l,theta,thetaCM,Tx), the first 6 boosted close to the GC
+SAMPLES = np.array([
+    [1.8752864,939726990000.0,0.35382077,0.35390019,0.00076524738,0.6046419,4.0],
+    [2.6916414,57012688000.0,5.7720643,5.7715842,0.00090917931,2.9151017,3.0],
+    [2.3270571,5408481900.0,20.760964,20.759668,0.00015106228,1.7351848,26.0],
+    [0.67562157,858540700000.0,6.0182017,6.0183253,0.00093341939,0.5672224,15.0],
+    [0.90049885,19581781.0,11.086089,11.086636,5.1788658e-06,2.7773466,29.0],
+    [2.6206603,9146863.6,0.11202726,0.11202529,0.0007529775,2.015557,4.0],
+    [0.015795914,4734102200.0,24.901432,19.382181,2.1104125,1.7897473,32.0],
+    [2.4636853,1835067.5,4.6338324,9.0119837,0.94379752,1.1821431,7.0],
+    [2.3912083,1637124.4,8.0279791,48.980286,2.745994,1.2910541,16.0],
+    [1.4038049,1228380500.0,26.409965,22.76677,2.080409,0.75237755,34.0],
+    [0.90909728,626954680.0,15.293724,58.724873,0.41348328,0.11956049,6.0],
+    [0.83527684,318424620000.0,25.414507,35.399502,2.6548793,2.7527226,24.0],
+    [0.76460876,5961527200.0,19.191515,36.303375,2.9686422,1.4694178,27.0],
+    [1.3352289,1215362600.0,22.253128,38.279795,2.8397383,1.7204467,17.0],
+    [1.5136448,957724530.0,2.7448682,40.587015,1.7898255,1.0121059,5.0],
+    [1.6604921,30555510.0,16.234315,9.0472812,0.45697592,2.3603568,20.0],
+])
+
+# dbdmSpectrum of the original Python implementation on SAMPLES with mx = 1e-2 MeV,
+# keyed on (is_spike,sigv,is_average)
+PINNED = {
+    (True,None,True):
+        [3.7590214570e-23,1.3159012135e-76,1.4575772066e-40,4.6407102003e-24,
+         1.4217251512e-163,3.7567845219e-18,8.1360255310e-40,9.6042850182e-55,
+         1.4544734362e-83,7.7013108515e-50,1.7976326105e-41,2.1615892325e-103,
+         5.8258366702e-37,4.7825867100e-47,6.8405671131e-28,9.2266002398e-87],
+    (True,None,False):
+        [1.1424748051e-21,1.5654044406e-75,7.7051838221e-32,1.1253367693e-22,
+         1.3836536521e-131,7.4044848558e-19,1.3069030719e-28,2.9127516685e-26,
+         7.9633022278e-32,6.7392645174e-30,5.6822557200e-27,2.1803035967e-101,
+         2.6510346586e-29,3.9981097631e-30,6.4093504443e-26,2.4376984516e-46],
+    (True,3.0,True):
+        [1.4736174205e-27,8.1483058059e-79,7.7105658529e-43,7.5395938925e-27,
+         4.1898306483e-166,6.4432522353e-22,8.1360004296e-40,9.6042845746e-55,
+         1.4544734361e-83,7.7013089633e-50,1.7976323334e-41,2.1615564990e-103,
+         5.8258322481e-37,4.7825862413e-47,6.8405657578e-28,9.2265956972e-87],
+    (True,3.0,False):
+        [4.4787474466e-26,9.6932763346e-78,4.0760329539e-34,1.8282939176e-25,
+         4.0776337630e-134,1.2699414438e-22,1.3068990398e-28,2.9127515339e-26,
+         7.9633022269e-32,6.7392628651e-30,5.6822548441e-27,2.1802705798e-101,
+         2.6510326463e-29,3.9981093713e-30,6.4093491744e-26,2.4376972514e-46],
+    (False,None,True):
+        [1.9315136269e-26,1.5667731661e-79,1.2226420691e-43,1.0250753013e-26,
+         1.3963988748e-166,4.3019592052e-22,8.1360255310e-40,9.6042850182e-55,
+         1.4544734362e-83,7.7013108515e-50,1.7976326105e-41,2.1615892325e-103,
+         5.8258366702e-37,4.7825867100e-47,6.8405671131e-28,9.2266002398e-87],
+    (False,None,False):
+        [5.8704257998e-25,1.8638433086e-78,6.4632472630e-35,2.4857292916e-25,
+         1.3590055724e-134,8.4790042121e-23,1.3069030719e-28,2.9127516685e-26,
+         7.9633022278e-32,6.7392645174e-30,5.6822557200e-27,2.1803035967e-101,
+         2.6510346586e-29,3.9981097631e-30,6.4093504443e-26,2.4376984516e-46],
+    (False,3.0,True):
+        [1.9315136269e-26,1.5667731661e-79,1.2226420691e-43,1.0250753013e-26,
+         1.3963988748e-166,4.3019592052e-22,8.1360255310e-40,9.6042850182e-55,
+         1.4544734362e-83,7.7013108515e-50,1.7976326105e-41,2.1615892325e-103,
+         5.8258366702e-37,4.7825867100e-47,6.8405671131e-28,9.2266002398e-87],
+    (False,3.0,False):
+        [5.8704257998e-25,1.8638433086e-78,6.4632472630e-35,2.4857292916e-25,
+         1.3590055724e-134,8.4790042121e-23,1.3069030719e-28,2.9127516685e-26,
+         7.9633022278e-32,6.7392645174e-30,5.6822557200e-27,2.1803035967e-101,
+         2.6510346586e-29,3.9981097631e-30,6.4093504443e-26,2.4376984516e-46],
+}
+
+
+def relativeError(a,b):
+    return np.max(np.abs(np.asarray(a) - b)/np.abs(b))
+
+
+def checkSpectrum(mx=1e-2,rtol=1e-6):
+    """
+    dbdmSpectrum and _dbdmBatchSpectrum, for flux with an integer Tx and for event,
+    with both the parallel and the serial (nproc > 1) kernels, against PINNED
+    """
+    spectrum = dukes.dbdmSpectrum()
+    for (is_spike,sigv,is_average),pinned in PINNED.items():
+        for x,ref in zip(SAMPLES,pinned):
+            z,MG,R,l,theta,thetaCM,Tx = x
+            results = [spectrum(z,MG,Tx,mx,R,l,theta,thetaCM,is_spike,is_average,sigv,184,24.42,24.3856,True)]
+            cols = [0,1,2,3,4,5] if is_average is True else [0,1,3,4,5]
+            for nproc in (1,2):
+                flux = _dbdmBatchSpectrum(int(Tx),mx,R,is_spike,is_average,sigv,184,24.42,24.3856,True,nproc)
+                results.append(flux(x[None,cols])[0]*dukes.constant.sigma0)
+                # event: Tx is the last integration variable and the spectrum carries vBDM
+                event = _dbdmBatchSpectrum(None,mx,R,is_spike,is_average,sigv,184,24.42,24.3856,True,nproc)
+                results.append(event(x[None,cols + [6]])[0]*dukes.constant.sigma0/dukes.vBDM(Tx,mx))
+            err = relativeError(results,ref)
+            assert err < rtol,f'is_spike={is_spike} sigv={sigv} is_average={is_average} sample {x}: {err:.1e}'
+        print(f'spectrum is_spike={is_spike} sigv={sigv} is_average={is_average}: agrees within {rtol:.0e}')
+
+
+def checkMilkyWaySpike(rtol=1e-10):
+    """
+    dmNumberDensity and haloSpike with MG = None, i.e. the MW spike, against the original implementation
+    """
+    # (r, sigv, number density in 1/cm^3) for mx = 1 MeV and the default tBH and halo parameters
+    pinned = [(1e-5,None,6673715574467.728),(1e-5,3.0,105627543.54921922),(1e-3,None,6676956618.266629),
+              (1.0,None,4146.710432928222)]
+    for r,sigv,ref in pinned:
+        for nx in (dukes.dmNumberDensity(r,1.0,None,sigv=sigv),dukes.haloSpike()(r,1.0,None,sigv,1e10,184,24.42,24.3856)):
+            assert relativeError(nx,ref) < rtol
+    assert relativeError(dukes.dmNumberDensity(np.array([1e-5,1.0]),1.0,None),[pinned[0][2],pinned[3][2]]) < rtol
+    print(f'MW spike: agrees within {rtol:.0e}')
+
+
+def checkSpikeTable(rng,n=20000,eta=24.3856):
+    """
+    Pointwise error of the tabulated spike density for r log-uniform from ri to 100 kpc
+    and MG log-uniform, as stated in the usetable docstring: about 12% at most, across
+    Rsp, and about 0.16% at the 99th percentile
+    """
+    MG = 10**rng.uniform(6,12,n)
+    r = 4*dukes.radiusSchwarzschild(dukes.massBH(MG,eta))*10**rng.uniform(0,15,n)
+    r,MG = r[r < 100],MG[r < 100]
+    table = _getSpikeTable(184.0,24.42,eta,True)
+    nx = np.vectorize(_kernels._nxSpikeNoAnn,excluded={6})
+    err = np.abs(nx(r,1.0,MG,184.0,24.42,eta,table)/nx(r,1.0,MG,184.0,24.42,eta,_kernels._noSpikeTable) - 1)
+    print(f'spike table: max {err.max():.2%}, 99th percentile {np.percentile(err,99):.3%}')
+    assert err.max() < 0.13 and np.percentile(err,99) < 0.002
+
+
+def checkAgreement(name,result,ref,rtol):
+    """
+    Monte Carlo results against the default evaluation, rtol is about 4 times the
+    scatter of their difference measured over repeated calls
+    """
+    err = abs(result/ref - 1)
+    print(f'{name}: {result:.4e} vs {ref:.4e}, {err:.1%} < {rtol:.0%}')
+    assert np.isfinite(result) and err < rtol
+
+
+if __name__ == '__main__':
+
+    kwargs = {'nitn': 2,'neval': 2000}
+
+    # vegas forks its workers only before any parallel kernel has run in this process
+    for result in (dukes.flux(10,1e-3,nproc=2,**kwargs),dukes.flux(10,1e-3,usetable=True,nproc=2,**kwargs)):
+        assert np.isfinite(result) and result > 0
+    print('flux nproc=2 and usetable nproc=2: finite')
+
+    checkSpectrum()
+    checkMilkyWaySpike()
+    checkSpikeTable(np.random.default_rng(1))
+
+    flux = dukes.flux(20,1e-3)
+    checkAgreement('flux usetable',dukes.flux(20,1e-3,usetable=True),flux,0.05)
+    dukes.flux(10,1e-3,usecache=True)
+    checkAgreement('flux usecache on the grid adapted at Tx = 10',dukes.flux(20,1e-3,usecache=True),flux,0.05)
+    dukes.clearCache()
+    fluxNFW = dukes.flux(20,1e-3,is_spike=False)
+    sobol = dukes.flux(20,1e-3,is_spike=False,method='sobol',seed=1)
+    checkAgreement('flux sobol',sobol,fluxNFW,0.12)
+    assert sobol == dukes.flux(20,1e-3,is_spike=False,method='sobol',seed=1,nproc=4)
+    eventSobol = dukes.event(1e-3,is_spike=False,method='sobol',seed=1,neval=2**18)
+    checkAgreement('event sobol',eventSobol,dukes.event(1e-3,is_spike=False),0.12)
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        result = dukes.flux(10,1e-3,nproc=2,**kwargs)
+    assert np.isfinite(result) and any(issubclass(w.category,RuntimeWarning) for w in caught)
+    print('flux nproc=2 after the thread pool started: falls back to nproc=1')
+    try:
+        dukes.flux(10,1e-3,method='plain',**kwargs)
+    except ValueError:
+        print('flux method=\'plain\': ValueError')
+    else:
+        raise AssertionError('flux accepted an invalid method')
+
+    print('All checks passed')